@@ -1,3 +1,31 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+
+# orjson is optional, it parses the OpenROAD JSON reports several times faster
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Placeholders of the templates look like [[CORE_UTILIZATION]]
+_PLACEHOLDER_RE = re.compile(r"\[\[\w+\]\]")
+
+# The umask is read once at import, os.umask can only be read by setting it, which is not thread safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 # def replace_placeholders(input_file_path, output_file_path, placeholder_dict):
 #     """
 #     Read content from input_file_path, replace the placeholders with the values from
@@ -30,16 +58,323 @@ def replace_placeholders(input_file_path, output_file_path, *placeholder_dicts):
     :param placeholder_dicts: One or more dictionaries of placeholders and their corresponding replacements.
     """
 
-    # Read content from the input file
+    # Read content from the input file, once per process
+    content = load_template(input_file_path)
+
+    # Write the modified content to the output file, unless it is already up to date
+    write_if_changed(output_file_path, fill_placeholders(content, *placeholder_dicts))
+
+@lru_cache(maxsize=None)
+def load_template(input_file_path):
+    """
+    Read a template file once, later calls for the same path are served from memory.
+
+    :param input_file_path: Path to the file containing placeholders.
+    :return: The template text.
+    """
     with open(input_file_path, 'r') as file:
-        content = file.read()
+        return file.read()
+
+def fill_placeholders(content, *placeholder_dicts):
+    """
+    Replace the placeholders of an already loaded template with the values from placeholder_dicts.
+
+    :param content: Template text containing placeholders.
+    :param placeholder_dicts: One or more dictionaries of placeholders and their corresponding replacements.
+    :return: The text with placeholders replaced.
+    """
+
+    # Merge the dictionaries, the first one providing a placeholder wins (updated last), a single
+    # dictionary, the common per design case, is used as is without any copy
+    if len(placeholder_dicts) == 1:
+        replacements = placeholder_dicts[0]
+    else:
+        replacements = {}
+        for p_dict in reversed(placeholder_dicts):
+            replacements.update(p_dict)
+
+    # Replace all the placeholders in a single pass over the text, unknown ones are left as is
+    return _PLACEHOLDER_RE.sub(lambda match: replacements.get(match.group(0), match.group(0)), content)
+
+def write_if_changed(file_path, content):
+    """
+    Write content to file_path unless the file already holds exactly the same text.
+    An unchanged file keeps its mtime, so make does not treat it as a fresh dependency
+    and the OpenROAD flow stages behind it can be skipped. A changed file is replaced
+    atomically, a flow reading it never sees it half written. The file keeps its permissions,
+    and a symbolic link is followed so that its target is replaced, not the link.
+
+    :param file_path: Path of the file to write.
+    :param content: Text to write.
+    :return: True if the file was written, False if it was already up to date.
+    """
+    new_content = content.encode()
+    file_path = os.path.realpath(file_path)
+    exists = True
+    try:
+        # the old content is only read when the sizes match
+        if os.stat(file_path).st_size == len(new_content):
+            with open(file_path, 'rb') as file:
+                if file.read() == new_content:
+                    return False
+    except FileNotFoundError:
+        exists = False
+
+    # A uniquely named temporary file in the same directory, concurrent writers do not collide
+    # and the final rename stays on the same file system
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(file_path), delete=False) as file:
+        file.write(new_content)
+    try:
+        if exists:
+            shutil.copymode(file_path, file.name)
+        else:
+            # the temporary file is private (0600), a new file gets the usual permissions
+            os.chmod(file.name, 0o666 & ~_UMASK)
+        os.replace(file.name, file_path)
+    except BaseException:
+        os.unlink(file.name)
+        raise
+    return True
+
+def command_action(name, *commands):
+    """
+    Build a Scenario action running the given shell commands one after the other.
+    The function is a plain closure, nothing is compiled from source with exec/eval.
+
+    :param name: Name of the action, also used as the function name in the scenario logs.
+    :param commands: One or more shell commands.
+    :return: The action function.
+    """
+    def action():
+        for command in commands:
+            os.system(command)
+    action.__name__ = name
+    return action
+
+def jobs_stamp_dir(makefile_path):
+    """
+    Directory of the <target>.done stamps of the jobs run by make_jobs with makefile_path.
+    Removing it makes all these jobs run again.
+
+    :param makefile_path: Path of the generated Makefile.
+    :return: Path of the stamps directory, next to the Makefile.
+    """
+    return os.path.splitext(os.fspath(makefile_path))[0] + ".stamps"
+
+def _stamp_up_to_date(stamp_path, dependencies, optional_dependencies=()):
+    # Same rule as make: the stamp exists and no dependency is newer than it, the missing
+    # optional dependencies being left out like $(wildcard ...) does
+    try:
+        stamp_mtime = os.stat(stamp_path).st_mtime_ns
+        if any(os.stat(dependency).st_mtime_ns > stamp_mtime for dependency in dependencies):
+            return False
+    except FileNotFoundError:
+        return False
+    for dependency in optional_dependencies:
+        try:
+            if os.stat(dependency).st_mtime_ns > stamp_mtime:
+                return False
+        except FileNotFoundError:
+            pass
+    return True
+
+def make_jobs(makefile_path, jobs, nb_parallel_jobs, exports=None, log_dir=None, dependencies=None, optional_dependencies=None, force=False):
+    """
+    Run independent jobs through a generated Makefile and a single make -j -k invocation, so
+    that make schedules them itself instead of one Python worker per job. The jobs keep going
+    when one of them fails, make reports the failed targets at the end.
+
+    :param makefile_path: Path of the generated Makefile, only rewritten if the jobs changed.
+    :param jobs: Dictionary of (target name, command line) of the jobs.
+    :param nb_parallel_jobs: Maximum number of jobs running at the same time.
+    :param exports: Optional dictionary of environment variables exported to all the jobs.
+    :param log_dir: Optional directory of per job logs (<target>.log). The output of each job
+        goes straight to its file instead of interleaving on the terminal, and the last 200
+        lines are only printed if the job fails.
+    :param dependencies: Optional dictionary of (target name, list of paths). Such a job touches
+        a <target>.done stamp in the <makefile>.stamps directory when it succeeds, and make skips
+        it while the stamp is newer than all its dependencies, without running the command.
+        The skipped jobs are listed before make starts. A missing dependency is an error for make,
+        the job is then not run at all.
+    :param optional_dependencies: Optional dictionary of (target name, list of paths), like
+        dependencies but through $(wildcard ...): the missing ones are ignored instead of making
+        make give up the job. Meant for generated files whose names may differ.
+    :param force: Run all the jobs, even the ones whose stamp is up to date.
+    :return: The exit status of make, non zero if any job failed.
+    """
+    dependencies = dependencies or {}
+    optional_dependencies = optional_dependencies or {}
+    stamp_dir = jobs_stamp_dir(makefile_path)
+    make_dirs([stamp_dir] + ([log_dir] if log_dir is not None else []))
+
+    lines = ["# Generated by libs.utils.make_jobs, do not edit", ""]
+    for name, value in (exports or {}).items():
+        lines.append(f"export {name} := {value}")
+    lines += ["", ".PHONY: all " + " ".join(jobs), "all: " + " ".join(jobs), ""]
+    for target, command in jobs.items():
+        # The whole command runs in a subshell, so a compound command is redirected and checked
+        # as one. The jobs are not sub-makes of this Makefile, the -j/-k flags of the outer make
+        # must not reach a nested make through MAKEFLAGS without its jobserver.
+        command = f"( unset MAKEFLAGS MFLAGS MAKELEVEL; {command} )"
+        if log_dir is not None:
+            log_path = shlex.quote(os.path.join(log_dir, f"{target}.log"))
+            command = f"{command} > {log_path} 2>&1 || {{ tail -n 200 {log_path}; exit 1; }}"
+        # $ is the make variable prefix, literal ones are doubled
+        recipe = "\t" + command.replace("$", "$$")
+        if target in dependencies or target in optional_dependencies:
+            stamp_path = os.path.join(stamp_dir, f"{target}.done")
+            prerequisites = " ".join(os.fspath(dependency) for dependency in dependencies.get(target, ()))
+            if target in optional_dependencies:
+                optional = " ".join(os.fspath(dependency) for dependency in optional_dependencies[target])
+                prerequisites += f" $(wildcard {optional})"
+            lines += [f"{target}: {stamp_path}", "", f"{stamp_path}: {prerequisites}", recipe, "\ttouch $@", ""]
+        else:
+            lines += [f"{target}:", recipe, ""]
+    write_if_changed(makefile_path, "\n".join(lines))
+
+    argv = ["make", "-f", os.fspath(makefile_path), "-j", str(nb_parallel_jobs), "-k", "all"]
+    if force:
+        argv.insert(1, "-B")
+    else:
+        for target in jobs:
+            if target not in dependencies and target not in optional_dependencies:
+                continue
+            stamp_path = os.path.join(stamp_dir, f"{target}.done")
+            if _stamp_up_to_date(stamp_path, dependencies.get(target, ()), optional_dependencies.get(target, ())):
+                print(f"skipped, up to date: {target}")
+    return subprocess.run(argv).returncode
+
+async def _run_command(command, semaphore, log_path=None):
+    async with semaphore:
+        if log_path is None:
+            process = await asyncio.create_subprocess_exec(*shlex.split(command))
+            return await process.wait()
+        # the output goes straight to the log file, it is never buffered in this process
+        with open(log_path, "wb") as log_file:
+            process = await asyncio.create_subprocess_exec(*shlex.split(command), stdout=log_file, stderr=subprocess.STDOUT)
+            return_code = await process.wait()
+        if return_code != 0:
+            with open(log_path, errors="replace") as log_file:
+                print(f"{command} failed, last lines of {log_path}:")
+                print("".join(deque(log_file, maxlen=200)), end="")
+        return return_code
+
+async def _run_commands(commands, concurrency, log_paths):
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(_run_command(command, semaphore, log_path) for command, log_path in zip(commands, log_paths)))
+
+def run_commands(commands, concurrency, log_paths=None):
+    """
+    Run independent commands with at most concurrency of them at the same time, from a single
+    event loop instead of a worker process per command. Without log_paths the outputs are not
+    captured, the commands write to the terminal like with os.system.
+
+    :param commands: Iterable of command lines, run without an intermediate shell.
+    :param concurrency: Maximum number of commands running at the same time.
+    :param log_paths: Optional log file per command, receiving its stdout and stderr. Only the tail of the logs of the failed commands is printed.
+    :return: List of the exit statuses, in the order of the commands.
+    """
+    commands = list(commands)
+    if log_paths is None:
+        log_paths = [None] * len(commands)
+    else:
+        log_paths = [str(log_path) for log_path in log_paths]
+        make_dirs({os.path.dirname(log_path) for log_path in log_paths})
+    return asyncio.run(_run_commands(commands, concurrency, log_paths))
+
+def write_files(files, max_workers=None):
+    """
+    Write a burst of small generated files (config.mk, constraint.sdc, ...) concurrently,
+    the writes overlapping in a thread pool instead of running one after the other.
+
+    :param files: Iterable of (file_path, content) pairs.
+    :param max_workers: Maximum number of writer threads, ThreadPoolExecutor default if None.
+    :return: List of booleans, True for each file that was actually written.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda file: write_if_changed(*file), files))
+
+def make_dirs(dir_paths):
+    """
+    Create all the given directories (and their parents) in one sweep, without spawning
+    a shell per directory.
+
+    :param dir_paths: Iterable of directory paths, already existing ones are left untouched.
+    """
+    for dir_path in dir_paths:
+        os.makedirs(dir_path, exist_ok=True)
+
+def inputs_digest(command, dependencies=()):
+    """
+    Hash a shell command together with the modification times of the files it depends on.
+
+    :param command: The command line that produces some artifacts.
+    :param dependencies: Paths (binaries, input files) whose changes must trigger a rerun.
+    :return: Hexadecimal blake2b digest of the inputs.
+    """
+    digest = hashlib.blake2b(command.encode(), digest_size=16)
+    for dependency in dependencies:
+        try:
+            digest.update(str(os.stat(dependency).st_mtime_ns).encode())
+        except FileNotFoundError:
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+def run_if_inputs_changed(command, stamp_path, dependencies=(), outputs=(), cwd=None):
+    """
+    Run command through the shell unless stamp_path records the same inputs digest
+    and all the expected outputs are still there. The stamp is only (re)written when
+    the command succeeds, so failed runs are retried next time.
+
+    :param command: The command line to run.
+    :param stamp_path: Sidecar file (*.inputs.blake) holding the digest of the last successful run.
+    :param dependencies: Paths whose modification invalidates the stamp.
+    :param outputs: Paths that must exist for the stamp to be trusted.
+    :param cwd: Working directory of the command, the current one if None. Tools writing side
+        files in their working directory need their own one to run in parallel.
+    :return: The exit status of the command, 0 if it was skipped.
+    """
+    digest = inputs_digest(command, dependencies)
+    try:
+        with open(stamp_path, 'r') as file:
+            up_to_date = file.read() == digest
+    except FileNotFoundError:
+        up_to_date = False
+
+    if up_to_date and all(os.path.exists(output) for output in outputs):
+        return 0
 
-    # Iterate through each provided dictionary and replace the placeholders
-    for p_dict in placeholder_dicts:
-        for placeholder, value in p_dict.items():
-            content = content.replace(placeholder, value)
+    status = subprocess.run(command, shell=True, cwd=cwd).returncode
+    if status == 0:
+        write_if_changed(stamp_path, digest)
+    return status
 
-    # Write the modified content to the output file
-    with open(output_file_path, 'w') as file:
-        file.write(content)
+# Shared by all the missing or invalid files, read only like the cached reports
+_EMPTY_JSON = MappingProxyType({})
 
+@lru_cache(maxsize=4096)
+def _load_json_cached(file_path, mtime_ns, size):
+    try:
+        with open(file_path, 'rb') as file:
+            content = _json_loads(file.read())
+    except (OSError, ValueError):
+        return _EMPTY_JSON
+    # The cached dict is shared by every caller, it is handed out as a read only view
+    return MappingProxyType(content) if isinstance(content, dict) else content
+
+def load_json(file_path):
+    """
+    Load a JSON file (e.g. an OpenROAD report), parsed once per version of the file and then
+    served from a module level cache shared by all callers. The cache is keyed on the
+    modification time and size of the file, so a report rewritten by a new flow run is parsed
+    again. JSON objects are returned as read only mappings, copy them with dict() to modify them.
+
+    :param file_path: Path of the JSON file, str or Path.
+    :return: The parsed content, or an empty mapping if the file is missing or invalid.
+    """
+    file_path = os.fspath(file_path)
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return _EMPTY_JSON
+    return _load_json_cached(file_path, stat.st_mtime_ns, stat.st_size)
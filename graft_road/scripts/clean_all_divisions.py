@@ -2,51 +2,41 @@
 
 # Author: Ledoux Louis
 
-from config import FLOW_DIR
+import shutil
 
-from libs.scenario import Scenario
+from config import FLOW_DIR, OUTPUTS_DIR
+
+from libs.utils import jobs_stamp_dir, run_commands
 from inputs.pdk_configs import PDKS
 from inputs.division_configs import division_configs
-import os
-
-# define the actions to perform and their inter dependencies
-actions_push = {}
-dependencies_push = {}
 
 # todo(lledoux): be careful with this path
 COMMAND_TEMPLATE_FULL_FLOW = f"make -C {FLOW_DIR} DESIGN_CONFIG=./designs/{{}}/divisions/{{}}/config.mk clean_all"
 
 # todo(lledoux): create commands that generates tables(CSV,TXT,TEX) from reports (area, cells, power)
 
-for p in PDKS:
-    for dc in division_configs.keys():
-        fct_name = "fct_rtl2gds_{}_{}".format(p,dc)
-        exec(
-            'def {}():'.format(fct_name) +
-    		'\n\tos.system("{}")'.format(COMMAND_TEMPLATE_FULL_FLOW.format(p,dc))
-        )
-        actions_push[fct_name] = eval(fct_name)
-        dependencies_push[fct_name]=[]
+# the cleanings do not depend on each other, they are a flat batch of commands
+commands = [COMMAND_TEMPLATE_FULL_FLOW.format(p,dc) for p in PDKS for dc in division_configs.keys()]
 
-# first attempt to No Human In Loop Register Transfer Level to Graphic Design System
-def NHIL_RTL_2_GDS():
+# the stamps of the flows that compile_all already ran, stale once the flow results are cleaned
+PATH_COMPILE_STAMPS = jobs_stamp_dir(OUTPUTS_DIR / "compile_all_divisions.mk")
 
-    # create the actions dictionary, in this case local actions are the global ones
-    actions = actions_push
+# each cleaning writes to its own log file instead of interleaving on the terminal
+PATH_LOGS = OUTPUTS_DIR / "logs" / "clean_all_divisions"
+log_paths = [PATH_LOGS / f"{p}_{dc}.log" for p in PDKS for dc in division_configs.keys()]
 
-    # create the dependencies dictionary, in this case local dependencies are the global ones
-    dependencies = dependencies_push
+# first attempt to No Human In Loop Register Transfer Level to Graphic Design System
+def NHIL_RTL_2_GDS():
 
-    print("================ACTIONS=================")
-    print(actions)
-    print("==============DEPENDENCIES==============")
-    print(dependencies)
+    # compile_all must run every flow again after the cleaning
+    shutil.rmtree(PATH_COMPILE_STAMPS, ignore_errors=True)
 
-    # then create the scenario
-    rtl2gds = Scenario(actions, dependencies, log=True)
+    # launch all the cleanings with up to 12 parallel commands
+    return_codes = run_commands(commands, 12, log_paths)
 
-    # launch the scenario until it succeed with up to 12 parallel actions
-    rtl2gds.exec_once_sync_parallel(12)
+    failed = [command for command, return_code in zip(commands, return_codes) if return_code != 0]
+    for command in failed:
+        print(f"failed: {command}")
 
 def main():
 
@@ -2,16 +2,30 @@
 
 # Author: Ledoux Louis
 
-from libs.scenario import Scenario
+import argparse
+import os
+
+from libs.utils import make_jobs
 from inputs.pdk_configs import PDKS
 from inputs.division_configs import division_configs
-import os
 
-from config import FLOW_DIR
+from config import FLOW_DIR, FLOW_DESIGNS_DIR, FLOW_DESIGNS_SRC_DIVISIONS_DIR, OUTPUTS_DIR
+
+# define the jobs to perform, the flows do not depend on each other, and the files whose
+# changes make a finished flow run again
+jobs = {}
+jobs_dependencies = {}
+jobs_sources = {}
+
+# number of flows running at the same time, the machine cores are shared among them
+NB_PARALLEL_FLOWS = 12
 
-# define the actions to perform and their inter dependencies
-actions_push = {}
-dependencies_push = {}
+# NUM_CORES is the thread count OpenROAD-flow-scripts hands to each tool, a fair share of the machine
+NUM_CORES = max(1, (os.cpu_count() or 1) // NB_PARALLEL_FLOWS)
+
+# the generated Makefile running all the flows, and the directory of their logs
+PATH_MAKEFILE = OUTPUTS_DIR / "compile_all_divisions.mk"
+PATH_LOGS = OUTPUTS_DIR / "logs" / "compile_all_divisions"
 
 # todo(lledoux): be careful with this path
 COMMAND_TEMPLATE_FULL_FLOW = f"make -C {FLOW_DIR} DESIGN_CONFIG=./designs/{{}}/divisions/{{}}/config.mk"
@@ -21,37 +35,39 @@ COMMAND_TEMPLATE_FULL_FLOW = f"make -C {FLOW_DIR} DESIGN_CONFIG=./designs/{{}}/d
 for p in PDKS:
     for dc in division_configs.keys():
         fct_name = "fct_rtl2gds_{}_{}".format(p,dc)
-        exec(
-            'def {}():'.format(fct_name) +
-    		'\n\tos.system("{}")'.format(COMMAND_TEMPLATE_FULL_FLOW.format(p,dc))
-        )
-        actions_push[fct_name] = eval(fct_name)
-        dependencies_push[fct_name]=[]
+        jobs[fct_name] = COMMAND_TEMPLATE_FULL_FLOW.format(p,dc)
+        jobs_dependencies[fct_name] = [
+            FLOW_DESIGNS_DIR / p / "divisions" / dc / "config.mk",
+            FLOW_DESIGNS_DIR / p / "divisions" / dc / "constraint.sdc"
+        ]
+        # the sources are generated, a missing one must not make make skip the flow
+        jobs_sources[fct_name] = [
+            FLOW_DESIGNS_SRC_DIVISIONS_DIR / dc / f"{dc}.vhdl",
+            FLOW_DESIGNS_SRC_DIVISIONS_DIR / dc / f"{dc}.v"
+        ]
 
 # first attempt to No Human In Loop Register Transfer Level to Graphic Design System
-def NHIL_RTL_2_GDS():
-
-    # create the actions dictionary, in this case local actions are the global ones
-    actions = actions_push
+def NHIL_RTL_2_GDS(force=False):
 
-    # create the dependencies dictionary, in this case local dependencies are the global ones
-    dependencies = dependencies_push
+    print("==================JOBS==================")
+    print(jobs)
 
-    print("================ACTIONS=================")
-    print(actions)
-    print("==============DEPENDENCIES==============")
-    print(dependencies)
+    # launch all the flows with up to NB_PARALLEL_FLOWS parallel make jobs, make keeps going on errors
+    # and skips the flows that already succeeded with their current config and sources, unless forced
+    make_jobs(PATH_MAKEFILE, jobs, NB_PARALLEL_FLOWS, exports={"NUM_CORES": NUM_CORES}, log_dir=PATH_LOGS, dependencies=jobs_dependencies, optional_dependencies=jobs_sources, force=force)
 
-    # then create the scenario
-    rtl2gds = Scenario(actions, dependencies, log=True)
-
-    # launch the scenario until it succeed with up to 12 parallel actions
-    rtl2gds.exec_once_sync_parallel(12)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the RTL to GDS flow of all the designs.")
+    parser.add_argument('--force', action='store_true',
+                        help='Run all the flows again, even the ones that already succeeded with their current config and sources.')
+    return parser.parse_args()
 
 def main():
 
+    args = parse_args()
+
     # create and play a run
-    NHIL_RTL_2_GDS()
+    NHIL_RTL_2_GDS(args.force)
 
 if __name__ == '__main__':
     main()
@@ -2,12 +2,13 @@
 
 # Author: Ledoux Louis
 import os
+from concurrent.futures import ThreadPoolExecutor
 from math import log2,ceil
 
 from libs.scenario import Scenario
 from inputs.pdk_configs import PDKS
 from inputs.SA_LLMMMM_configs import total_configs
-from libs.utils import replace_placeholders
+from libs.utils import fill_placeholders, load_template, make_dirs, run_if_inputs_changed, write_files
 from templates.placeholders import placeholders_config, placeholders_constraint
 from config import *
 
@@ -15,10 +16,11 @@ experiment = "sa_llmmmm"
 
 PATH_PLACEHOLDERS_IN       = f"{TEMPLATES_DIR}/{{}}"
 PATH_PLACEHOLDERS_OUT      = f"{FLOW_DESIGNS_DIR}/{{}}/{experiment}/{{}}/{{}}"
-COMMAND_CREATE_SRC_DIR     = "mkdir -p {}/{}"
-COMMAND_CREATE_CFG_DIR     = f"mkdir -p {{}}/{{}}/{experiment}/{{}}"
+PATH_CFG_DIR               = f"{{}}/{{}}/{experiment}/{{}}"
 COMMAND_GENERATE_SA_LLMMMM = "{} {} N={} M={} arithmetic_in={} arithmetic_out=same msb_summand={} lsb_summand={} nb_bits_ovf={} name={} chunk_size={} frequency=200 outputFile={}/{}/{}.vhdl"
 COMMAND_TRANSLATION_VH2V   = "python3 {} --input_file {}/{}/{}.vhdl --output_dir {}/{}/"
+PATH_STAMP                 = "{}/{}/{}.{}.inputs.blake"
+PATH_WORK_DIR              = "{}/{}/work"
 
 
 # steps
@@ -28,96 +30,109 @@ COMMAND_TRANSLATION_VH2V   = "python3 {} --input_file {}/{}/{}.vhdl --output_dir
 # 4. Translate generated VHDL into verilog and unflattend modules into subsequent files
 # 5. Generate from a template config.mk and constraint.sdc and put it in the corresponding PDK config folder
 
-def main():
-    # 1
-    for tc in total_configs.keys():
-        os.system(COMMAND_CREATE_SRC_DIR.format(FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,tc))
-
-    # 2
-    for p in PDKS:
-        for tc in total_configs.keys():
-            os.system(COMMAND_CREATE_CFG_DIR.format(FLOW_DESIGNS_DIR,p,tc))
+def generate_systolic_array(tc):
+    """Steps 3 and 4 for one systolic array, the designs being independent of each other."""
+    # the VHDL is the output of step 3 and the input of step 4, its path is formatted once
+    vhdl_path = f"{FLOW_DESIGNS_SRC_SA_LLMMMM_DIR}/{tc}/{tc}.vhdl"
+    # the top level netlist written by step 4
+    v_path = f"{FLOW_DESIGNS_SRC_SA_LLMMMM_DIR}/{tc}/{tc}.v"
+    # FloPoCo writes side files (BitHeap .svg, .dot) in its working directory, each design
+    # gets its own one so that the parallel runs do not overwrite each other's files
+    work_dir = PATH_WORK_DIR.format(FLOW_DESIGNS_SRC_SA_LLMMMM_DIR, tc)
 
     # 3
-    for tc in total_configs.keys():
-        binary_exec = "SystolicArray"
-
-        # Retrieve the configuration entry for the current key
-        entry = total_configs[tc]
-
-        # Extract arithmetic format and accumulator configuration details
-        arith_format = entry["arithmetic_format"]
-        accum_config = entry["accumulator_config"]
-
-        # Construct the arith_in string based on arithmetic format details
-        # This example assumes the format "ieee:exp:mantissa", adjust as necessary
-        arith_in = arith_format["flopoco_name"]
-
-        # Extract MSB, LSB, and OVF from the accumulator configuration
-        msb = accum_config["msb"]
-        lsb = accum_config["lsb"]
-        ovf = accum_config["ovf"]
-        chunksize = accum_config["total_width"]
-
-        print(COMMAND_GENERATE_SA_LLMMMM.format(
-
-            FLOPOCO_SA_BIN, # which flopoco
-            binary_exec, # SystolicArray
-            8, # N
-            8, # M
-            arith_in,
-            msb,
-            lsb,
-            ovf,
-            tc,
-            chunksize,
-            FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,
-            tc,
-            tc
-        ))
-        os.system(COMMAND_GENERATE_SA_LLMMMM.format(
-
-            FLOPOCO_SA_BIN, # which flopoco
-            binary_exec, # SystolicArray
-            8, # N
-            8, # M
-            arith_in,
-            msb,
-            lsb,
-            ovf,
-            tc,
-            chunksize,
-            FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,
-            tc,
-            tc
-        ))
+    binary_exec = "SystolicArray"
+
+    # Retrieve the configuration entry for the current key
+    entry = total_configs[tc]
+
+    # Extract arithmetic format and accumulator configuration details
+    arith_format = entry["arithmetic_format"]
+    accum_config = entry["accumulator_config"]
+
+    # Construct the arith_in string based on arithmetic format details
+    # This example assumes the format "ieee:exp:mantissa", adjust as necessary
+    arith_in = arith_format["flopoco_name"]
+
+    # Extract MSB, LSB, and OVF from the accumulator configuration
+    msb = accum_config["msb"]
+    lsb = accum_config["lsb"]
+    ovf = accum_config["ovf"]
+    chunksize = accum_config["total_width"]
+
+    command = COMMAND_GENERATE_SA_LLMMMM.format(
+
+        FLOPOCO_SA_BIN, # which flopoco
+        binary_exec, # SystolicArray
+        8, # N
+        8, # M
+        arith_in,
+        msb,
+        lsb,
+        ovf,
+        tc,
+        chunksize,
+        FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,
+        tc,
+        tc
+    )
+    print(command)
+    # skipped when neither the command nor the FloPoCo binary changed since the last run
+    run_if_inputs_changed(
+        command,
+        PATH_STAMP.format(FLOW_DESIGNS_SRC_SA_LLMMMM_DIR, tc, tc, "flopoco"),
+        dependencies=[FLOPOCO_SA_BIN],
+        outputs=[vhdl_path],
+        cwd=work_dir
+    )
 
     # 4
-    for tc in total_configs.keys():
-        os.system(COMMAND_TRANSLATION_VH2V.format(
+    run_if_inputs_changed(
+        COMMAND_TRANSLATION_VH2V.format(
             VH2V_BIN,
             FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,
             tc,
             tc,
             FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,
             tc
-        ))
+        ),
+        PATH_STAMP.format(FLOW_DESIGNS_SRC_SA_LLMMMM_DIR, tc, tc, "vh2v"),
+        dependencies=[VH2V_BIN, vhdl_path],
+        outputs=[v_path],
+        cwd=work_dir
+    )
 
-    # 5
+def main():
+    # 1 and 2, all directories in a single sweep, the src directories with their work directory
+    make_dirs(
+        [PATH_WORK_DIR.format(FLOW_DESIGNS_SRC_SA_LLMMMM_DIR,tc) for tc in total_configs.keys()] +
+        [PATH_CFG_DIR.format(FLOW_DESIGNS_DIR,p,tc) for p in PDKS for tc in total_configs.keys()]
+    )
+
+    # 3 and 4, FloPoCo and vh2v are single threaded external tools, the designs are generated
+    # in parallel threads (the subprocess waits release the GIL), each one translated right after its generation
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(generate_systolic_array, total_configs.keys()))
+
+    # 5, templates are read once and all the files are written in a single batch
+    template_config = load_template(PATH_PLACEHOLDERS_IN.format("template_config.mk"))
+    template_constraint = load_template(PATH_PLACEHOLDERS_IN.format("template_constraint.sdc"))
+
+    generated_files = []
     for p in PDKS:
+        # The PDK placeholders are filled once per PDK, only the design name is left per design
+        pdk_config = fill_placeholders(template_config, placeholders_config[p], {"[[PDK]]":p, "[[EXPERIMENT]]": experiment})
+        pdk_constraint = fill_placeholders(template_constraint, placeholders_constraint[p])
         for tc in total_configs.keys():
-            replace_placeholders(
-                    PATH_PLACEHOLDERS_IN.format("template_config.mk"),
+            generated_files.append((
                     PATH_PLACEHOLDERS_OUT.format(p,tc,"config.mk"),
-                    placeholders_config[p],
-                    {"[[PDK]]":p,"[[DESIGN_NAME]]":tc, "[[EXPERIMENT]]": experiment}
-            )
-            replace_placeholders(
-                    PATH_PLACEHOLDERS_IN.format("template_constraint.sdc"),
+                    fill_placeholders(pdk_config, {"[[DESIGN_NAME]]":tc})
+            ))
+            generated_files.append((
                     PATH_PLACEHOLDERS_OUT.format(p,tc,"constraint.sdc"),
-                    placeholders_constraint[p],
-                    {"[[CURRENT_DESIGN]]":tc}
-            )
+                    fill_placeholders(pdk_constraint, {"[[CURRENT_DESIGN]]":tc})
+            ))
+    write_files(generated_files)
 
 if __name__ == '__main__':
     main()
@@ -2,12 +2,13 @@
 
 # Author: Ledoux Louis
 import os
+from concurrent.futures import ThreadPoolExecutor
 from math import log2,ceil
 
 from libs.scenario import Scenario
 from inputs.pdk_configs import PDKS
 from inputs.division_configs import division_configs
-from libs.utils import replace_placeholders
+from libs.utils import fill_placeholders, load_template, make_dirs, run_if_inputs_changed, write_files
 from templates.placeholders import placeholders_config, placeholders_constraint
 from config import *
 
@@ -18,10 +19,11 @@ from config import *
 #PATH_TRANSLATION_TOOLS   = "/home/lledoux/Documents/PhD/SUF/translation_tools/vh2v/vh2v.py"
 PATH_PLACEHOLDERS_IN     = f"{TEMPLATES_DIR}/{{}}"
 PATH_PLACEHOLDERS_OUT    = f"{FLOW_DESIGNS_DIR}/{{}}/divisions/{{}}/{{}}"
-COMMAND_CREATE_SRC_DIR   = "mkdir -p {}/{}"
-COMMAND_CREATE_CFG_DIR   = "mkdir -p {}/{}/divisions/{}"
+PATH_CFG_DIR             = "{}/{}/divisions/{}"
 COMMAND_GENERATE_DIV     = "{} {} ints=1 frac={} iters={} {} {} target=ManualPipeline name={} frequency=0 outputFile={}/{}/{}.vhdl"
 COMMAND_TRANSLATION_VH2V = "python3 {} --input_file {}/{}/{}.vhdl --output_dir {}/{}/"
+PATH_STAMP               = "{}/{}/{}.{}.inputs.blake"
+PATH_WORK_DIR            = "{}/{}/work"
 
 experiment = "divisions"
 
@@ -32,34 +34,35 @@ experiment = "divisions"
 # 4. Translate generated VHDL into verilog and unflattend modules into subsequent files
 # 5. Generate from a template config.mk and constraint.sdc and put it in the corresponding PDK config folder
 
-def main():
-    # 1
-    for dc in division_configs.keys():
-        os.system(COMMAND_CREATE_SRC_DIR.format(FLOW_DESIGNS_SRC_DIVISIONS_DIR,dc))
-
-    # 2
-    for p in PDKS:
-        for dc in division_configs.keys():
-            os.system(COMMAND_CREATE_CFG_DIR.format(FLOW_DESIGNS_DIR,p,dc))
+def generate_division(dc):
+    """Steps 3 and 4 for one division, the designs being independent of each other."""
+    # the VHDL is the output of step 3 and the input of step 4, its path is formatted once
+    vhdl_path = f"{FLOW_DESIGNS_SRC_DIVISIONS_DIR}/{dc}/{dc}.vhdl"
+    # the top level netlist written by step 4
+    v_path = f"{FLOW_DESIGNS_SRC_DIVISIONS_DIR}/{dc}/{dc}.v"
+    # FloPoCo writes side files (BitHeap .svg, .dot) in its working directory, each design
+    # gets its own one so that the parallel runs do not overwrite each other's files
+    work_dir = PATH_WORK_DIR.format(FLOW_DESIGNS_SRC_DIVISIONS_DIR, dc)
 
     # 3
-    for dc in division_configs.keys():
-        binary_exec = "FixDivPP" if division_configs[dc]["is_pipelined"] else "FixDiv"
-        useGoldschmidt = "useGoldschmidt=true" if division_configs[dc]["division_algorithm"]=="Goldschmidt" else "useGoldschmidt=false"
-        algorithm = division_configs[dc]["division_algorithm"]
-        mantissa_size = int(division_configs[dc]["mantissa_size"])
-        if division_configs[dc]["division_algorithm"] == "Non_Restoring":
-            iters = 0
-        else:
-            iters = ceil(log2(int(mantissa_size)))
-
-        # Fetch the value of adder_size from the dictionary
-        adder_size_value = division_configs[dc].get("adder_size")
-        # Conditionally format the string
-        adder_size_str = f"adder_size={adder_size_value}" if adder_size_value is not None else ""
-
-
-        os.system(COMMAND_GENERATE_DIV.format(
+    binary_exec = "FixDivPP" if division_configs[dc]["is_pipelined"] else "FixDiv"
+    useGoldschmidt = "useGoldschmidt=true" if division_configs[dc]["division_algorithm"]=="Goldschmidt" else "useGoldschmidt=false"
+    algorithm = division_configs[dc]["division_algorithm"]
+    mantissa_size = int(division_configs[dc]["mantissa_size"])
+    if division_configs[dc]["division_algorithm"] == "Non_Restoring":
+        iters = 0
+    else:
+        iters = ceil(log2(int(mantissa_size)))
+
+    # Fetch the value of adder_size from the dictionary
+    adder_size_value = division_configs[dc].get("adder_size")
+    # Conditionally format the string
+    adder_size_str = f"adder_size={adder_size_value}" if adder_size_value is not None else ""
+
+
+    # skipped when neither the command nor the FloPoCo binary changed since the last run
+    run_if_inputs_changed(
+        COMMAND_GENERATE_DIV.format(
             FLOPOCO_BIN,
             binary_exec,
             mantissa_size,
@@ -70,34 +73,60 @@ def main():
             FLOW_DESIGNS_SRC_DIVISIONS_DIR,
             dc,
             dc
-        ))
+        ),
+        PATH_STAMP.format(FLOW_DESIGNS_SRC_DIVISIONS_DIR, dc, dc, "flopoco"),
+        dependencies=[FLOPOCO_BIN],
+        outputs=[vhdl_path],
+        cwd=work_dir
+    )
 
     # 4
-    for dc in division_configs.keys():
-        os.system(COMMAND_TRANSLATION_VH2V.format(
+    run_if_inputs_changed(
+        COMMAND_TRANSLATION_VH2V.format(
             VH2V_BIN,
             FLOW_DESIGNS_SRC_DIVISIONS_DIR,
             dc,
             dc,
             FLOW_DESIGNS_SRC_DIVISIONS_DIR,
             dc
-        ))
+        ),
+        PATH_STAMP.format(FLOW_DESIGNS_SRC_DIVISIONS_DIR, dc, dc, "vh2v"),
+        dependencies=[VH2V_BIN, vhdl_path],
+        outputs=[v_path],
+        cwd=work_dir
+    )
+
+def main():
+    # 1 and 2, all directories in a single sweep, the src directories with their work directory
+    make_dirs(
+        [PATH_WORK_DIR.format(FLOW_DESIGNS_SRC_DIVISIONS_DIR,dc) for dc in division_configs.keys()] +
+        [PATH_CFG_DIR.format(FLOW_DESIGNS_DIR,p,dc) for p in PDKS for dc in division_configs.keys()]
+    )
+
+    # 3 and 4, FloPoCo and vh2v are single threaded external tools, the designs are generated
+    # in parallel threads (the subprocess waits release the GIL), each one translated right after its generation
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(generate_division, division_configs.keys()))
+
+    # 5, templates are read once and all the files are written in a single batch
+    template_config = load_template(PATH_PLACEHOLDERS_IN.format("template_config.mk"))
+    template_constraint = load_template(PATH_PLACEHOLDERS_IN.format("template_constraint.sdc"))
 
-    # 5
+    generated_files = []
     for p in PDKS:
+        # The PDK placeholders are filled once per PDK, only the design name is left per design
+        pdk_config = fill_placeholders(template_config, placeholders_config[p], {"[[PDK]]":p, "[[EXPERIMENT]]": experiment})
+        pdk_constraint = fill_placeholders(template_constraint, placeholders_constraint[p])
         for dc in division_configs.keys():
-            replace_placeholders(
-                    PATH_PLACEHOLDERS_IN.format("template_config.mk"),
+            generated_files.append((
                     PATH_PLACEHOLDERS_OUT.format(p,dc,"config.mk"),
-                    placeholders_config[p],
-                    {"[[PDK]]":p,"[[DESIGN_NAME]]":tc, "[[EXPERIMENT]]": experiment}
-            )
-            replace_placeholders(
-                    PATH_PLACEHOLDERS_IN.format("template_constraint.sdc"),
+                    fill_placeholders(pdk_config, {"[[DESIGN_NAME]]":dc})
+            ))
+            generated_files.append((
                     PATH_PLACEHOLDERS_OUT.format(p,dc,"constraint.sdc"),
-                    placeholders_constraint[p],
-                    {"[[CURRENT_DESIGN]]":dc}
-            )
+                    fill_placeholders(pdk_constraint, {"[[CURRENT_DESIGN]]":dc})
+            ))
+    write_files(generated_files)
 
 if __name__ == '__main__':
     main()
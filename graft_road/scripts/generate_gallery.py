@@ -2,30 +2,31 @@
 
 # Author: Ledoux Louis
 
-from scenario import Scenario
-from pdk_configs import PDKS
-from division_configs import division_configs
-import os
+from libs.scenario import Scenario
+from libs.utils import command_action
+from inputs.pdk_configs import PDKS
+from inputs.division_configs import division_configs
+
+from config import FLOW_DIR,OUTPUTS_DIR
 
 # define the actions to perform and their inter dependencies
 actions_push = {}
 dependencies_push = {}
 
 # todo(lledoux): be careful with this path
-COMMAND_TEMPLATE_IMAGE = "make -C /home/lledoux/Documents/PhD/SUF/OpenROAD-flow-scripts/flow/ DESIGN_CONFIG=./designs/{}/divisions/{}/config.mk gui_final"
-COMMAND_CP_WITH_NAME = "mv /tmp/tmp.png /home/lledoux/Documents/PhD/gallery/{}_{}.png"
+COMMAND_TEMPLATE_IMAGE = f"make -C {FLOW_DIR} DESIGN_CONFIG=./designs/{{}}/divisions/{{}}/config.mk gui_final"
+COMMAND_CP_WITH_NAME = f"mv /tmp/tmp.png {OUTPUTS_DIR}/gallery/{{}}_{{}}.png"
 
 for p in PDKS:
     for dc in division_configs.keys():
 
         # 1. Create the image as /tmp/tmp.png
         fct1_name = "fct_gds2png_{}_{}".format(p,dc)
-        exec(
-            'def {}():'.format(fct1_name) +
-    		'\n\tos.system("{}")'.format(COMMAND_TEMPLATE_IMAGE.format(p,dc))+
-    		'\n\tos.system("{}")'.format(COMMAND_CP_WITH_NAME.format(p,dc))
+        actions_push[fct1_name] = command_action(
+            fct1_name,
+            COMMAND_TEMPLATE_IMAGE.format(p,dc),
+            COMMAND_CP_WITH_NAME.format(p,dc)
         )
-        actions_push[fct1_name] = eval(fct1_name)
         dependencies_push[fct1_name]=[]
 
         ## 2. Rename it
@@ -4,6 +4,7 @@
 
 import os
 from libs.scenario import Scenario
+from libs.utils import command_action
 from inputs.pdk_configs import PDKS
 
 from inputs.pdk_configs import PDKS
@@ -24,12 +25,11 @@ for p in PDKS:
 
         # 1. Create the image as /tmp/tmp.png
         fct1_name = "fct_gds2png_{}_{}".format(p,tc)
-        exec(
-            'def {}():'.format(fct1_name) +
-    		'\n\tos.system("{}")'.format(COMMAND_TEMPLATE_IMAGE.format(p,tc))+
-    		'\n\tos.system("{}")'.format(COMMAND_CP_WITH_NAME.format(p,tc))
+        actions_push[fct1_name] = command_action(
+            fct1_name,
+            COMMAND_TEMPLATE_IMAGE.format(p,tc),
+            COMMAND_CP_WITH_NAME.format(p,tc)
         )
-        actions_push[fct1_name] = eval(fct1_name)
         dependencies_push[fct1_name]=[]
 
         ## 2. Rename it
@@ -2,16 +2,9 @@
 
 # Author: Ledoux Louis
 
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import numpy as np
+# numpy and matplotlib are only imported when plotting, the tables do not need them
 import math
-from mpl_toolkits.axes_grid1 import make_axes_locatable # for the size of colormap
 #from matplotlib.ticker import MaxNLocator
-from matplotlib.ticker import FuncFormatter
-import matplotlib.ticker as ticker
-from matplotlib.gridspec import GridSpec
-from matplotlib.lines import Line2D  # For custom legend
 
 from inputs.pdk_configs import PDKS
 from inputs.division_configs import division_configs
@@ -21,10 +14,12 @@ import pprint
 import os
 import csv
 import argparse
-import json
 from collections import defaultdict # to call append on None value of a key
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
 from config import FLOW_DIR
+from libs.utils import load_json, write_if_changed
 
 PATH_UNITS   =  f"{FLOW_DIR}/logs/{{}}/{{}}/base/2_1_floorplan.json"
 PATH_RESULTS =  f"{FLOW_DIR}/logs/{{}}/{{}}/base/6_report.json"
@@ -68,23 +63,24 @@ def set_size(width, fraction=1, subplots=(1, 1)):
     return fig_dim
 
 
-def adjust_value_based_on_unit(value, unit, is_area=False):
-    conversion_dict = {
-        # Power units
-        "1pW": 1e-12,
-        "1nW": 1e-9,
-        "1uW": 1e-6,
-        "1mW": 1e-3,
-        "1W": 1e0,
-        # Distance units
-        "1pm": 1e-12,
-        "1nm": 1e-9,
-        "1um": 1e-6,
-        "1mm": 1e-3,
-        "1m": 1e0,
-        # Add more units if required
-    }
+# Multiplier of each OpenROAD platform unit, built once instead of for every value
+conversion_dict = {
+    # Power units
+    "1pW": 1e-12,
+    "1nW": 1e-9,
+    "1uW": 1e-6,
+    "1mW": 1e-3,
+    "1W": 1e0,
+    # Distance units
+    "1pm": 1e-12,
+    "1nm": 1e-9,
+    "1um": 1e-6,
+    "1mm": 1e-3,
+    "1m": 1e0,
+    # Add more units if required
+}
 
+def adjust_value_based_on_unit(value, unit, is_area=False):
     multiplier = conversion_dict.get(unit, 1)
     if is_area:
         multiplier = multiplier ** 2
@@ -93,6 +89,19 @@ def adjust_value_based_on_unit(value, unit, is_area=False):
     return "{:.2e}".format(adjusted_value)
 
 
+@lru_cache(maxsize=None)
+def metric_unit_key(metric):
+    """Returns the key of the unit of a metric in the floorplan JSON, and whether it is an area.
+
+    Resolved once per metric name instead of for every report.
+    """
+    if "power" in metric:
+        return "run__flow__platform__power_units", False
+    elif "area" in metric:
+        return "run__flow__platform__distance_units", True  # Assuming area is in distance units squared
+    else:
+        return None, False
+
 def extract_metrics_from_json(metrics_file_path, units_file_path, metrics):
     """Extracts specified metrics from a JSON file and gets their units.
 
@@ -107,27 +116,20 @@ def extract_metrics_from_json(metrics_file_path, units_file_path, metrics):
 
     result = {}
 
-    if not os.path.exists(metrics_file_path):
+    # A missing report is loaded as an empty dict, the units file is then not even read
+    metrics_data = load_json(metrics_file_path)
+    if not metrics_data:
         return {metric: "N/A" for metric in metrics}
 
-    with open(units_file_path, 'r') as units_file:
-        units_data = json.load(units_file)
-
-    with open(metrics_file_path, 'r') as metrics_file:
-        metrics_data = json.load(metrics_file)
-
-    is_area = False
-    for metric in metrics:
-        value = metrics_data.get(metric, None)
-        if "power" in metric:
-            unit_key = "run__flow__platform__power_units"
-        elif "area" in metric:
-            unit_key = "run__flow__platform__distance_units"  # Assuming area is in distance units squared
-            is_area = True
-        else:
-            unit_key = None
+    # The floorplan report is only parsed when a power or area metric found in the report
+    # needs its unit, the metrics missing from the report have nothing to convert
+    values = [metrics_data.get(metric, None) for metric in metrics]
+    unit_keys = [metric_unit_key(metric) for metric in metrics]
+    needs_units = any(unit_key and value is not None for value, (unit_key, _) in zip(values, unit_keys))
+    units_data = load_json(units_file_path) if needs_units else {}
 
-        if unit_key:
+    for metric, value, (unit_key, is_area) in zip(metrics, values, unit_keys):
+        if unit_key and value is not None:
             unit_value = units_data.get(unit_key, None)
             if unit_value:
                 value = adjust_value_based_on_unit(value, unit_value, is_area)
@@ -135,6 +137,7 @@ def extract_metrics_from_json(metrics_file_path, units_file_path, metrics):
 
     return result
 
+@lru_cache(maxsize=None)
 def compute_latency(design_name):
     """Compute the latency for the given design name."""
     config = division_configs.get(design_name, {})
@@ -150,24 +153,26 @@ def compute_latency(design_name):
     else:
         return -1
 
+def extract_case_metrics(arithmetic, node):
+    """Extracts the metrics of one (arithmetic, tech node) case."""
+    metrics_file_path = PATH_RESULTS.format(node, arithmetic)
+    units_file_path = PATH_UNITS.format(node, arithmetic)
+
+    metrics_data = extract_metrics_from_json(metrics_file_path, units_file_path, ["finish__power__total", "finish__design__die__area", "finish__design__instance__count__stdcell"])
+
+    return {
+        "power": metrics_data["finish__power__total"],
+        "area": metrics_data["finish__design__die__area"],
+        "count_cell": metrics_data["finish__design__instance__count__stdcell"],
+        #"latency": compute_latency(arithmetic)
+    }
+
 def populate_data_dict():
     """Populates the data dictionary based on the JSON files."""
+    # The cases are a few dozen small JSON reads, served by the load_json cache on reruns
     data = {}
-
     for arithmetic in total_configs.keys():
-        data[arithmetic] = {}
-        for node in PDKS:
-            metrics_file_path = PATH_RESULTS.format(node, arithmetic)
-            units_file_path = PATH_UNITS.format(node, arithmetic)
-
-            metrics_data = extract_metrics_from_json(metrics_file_path, units_file_path, ["finish__power__total", "finish__design__die__area", "finish__design__instance__count__stdcell"])
-
-            data[arithmetic][node] = {
-                "power": metrics_data["finish__power__total"],
-                "area": metrics_data["finish__design__die__area"],
-                "count_cell": metrics_data["finish__design__instance__count__stdcell"],
-                #"latency": compute_latency(arithmetic)
-            }
+        data[arithmetic] = {node: extract_case_metrics(arithmetic, node) for node in PDKS}
 
     return data
 
@@ -181,98 +186,88 @@ def data_to_terminal(data, metric, unit):
     max_node_len = max(len(node) for arith in data for node in data[arith].keys())
     column_width = max(max_arith_len, max_node_len, len("Arithmetic"), 10) + 2  # +2 for padding
 
-    terminal_str = "+" + "-"*column_width + "+" + ("-"*column_width + "+")*len(data[first_key]) + "\n"
-    terminal_str += "|" + " Arithmetic".center(column_width) + "|"
+    # The lines are collected and joined once, the border is the same for the three rules
+    border = "+" + "-"*column_width + "+" + ("-"*column_width + "+")*len(data[first_key])
 
     # Process node names as column headers
-    for node in data[first_key].keys():
-        terminal_str += f"{node.center(column_width)}" + "|"
-    terminal_str += "\n+" + "-"*column_width + "+" + ("-"*column_width + "+")*len(data[first_key]) + "\n"
+    header = "|" + " Arithmetic".center(column_width) + "|" + "".join(f"{node.center(column_width)}" + "|" for node in data[first_key].keys())
+    lines = [border, header, border]
 
-    # Rows for each arithmetic type
+    # Rows for each arithmetic type, with the value for each process node
     for arithmetic, nodes in data.items():
-        terminal_str += "|" + arithmetic.center(column_width) + "|"
-
-        # Value for each process node
-        for process_node in nodes.keys():
-            val = str(nodes[process_node][metric])
-            terminal_str += val.center(column_width) + "|"
-        terminal_str += "\n"
-
-    terminal_str += "+" + "-"*column_width + "+" + ("-"*column_width + "+")*len(data[first_key]) + "\n"
-
-    return terminal_str
+        lines.append("|" + arithmetic.center(column_width) + "|" + "".join(str(values[metric]).center(column_width) + "|" for values in nodes.values()))
+
+    lines.append(border)
+
+    return "\n".join(lines) + "\n"
+
+# Translation table of the unsafe LaTeX characters, built once for all the cells
+latex_escapes = str.maketrans({
+    "#": r"\#",
+    "$": r"\$",
+    "%": r"\%",
+    "&": r"\&",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\^{}",
+    "\\": r"\textbackslash{}",
+})
 
 def escape_latex(text):
     """
     Escape unsafe LaTeX characters: # $ % & _ { } ~ ^
     """
-    mapping = {
-        "#": r"\#",
-        "$": r"\$",
-        "%": r"\%",
-        "&": r"\&",
-        "_": r"\_",
-        "{": r"\{",
-        "}": r"\}",
-        "~": r"\textasciitilde{}",
-        "^": r"\^{}",
-        "\\": r"\textbackslash{}",
-    }
-    return "".join(mapping.get(char, char) for char in text)
+    return text.translate(latex_escapes)
 
 def data_to_latex(data, metric, unit):
     # Get any key from the dictionary to determine the headers
     first_key = next(iter(data))
 
     num_columns = len(data[first_key]) + 1
+    header = "Arithmetic & " + " & ".join(escape_latex(node) for node in data[first_key].keys()) + "\\\\ \\hline\n"
 
+    # The pieces are collected and joined once
     # Begin the table using the longtable environment combined with tabularx
-    latex_str = "\\begin{tabularx}{\\linewidth}{" + "|c" + "|X"*len(data[first_key]) + "|}\n"
+    parts = ["\\begin{tabularx}{\\linewidth}{" + "|c" + "|X"*len(data[first_key]) + "|}\n"]
 
     # Caption on top
-    latex_str += "\\caption{" + escape_latex(metric.capitalize() + " (" + unit + ") Data") + "}\\\\\n"
+    parts.append("\\caption{" + escape_latex(metric.capitalize() + " (" + unit + ") Data") + "}\\\\\n")
 
     # Header
-    latex_str += "\\hline\n"
-    latex_str += "Arithmetic & " + " & ".join(escape_latex(node) for node in data[first_key].keys()) + "\\\\ \\hline\n"
-    latex_str += "\\endfirsthead\n" # This ends the setup for the first header
+    parts.append("\\hline\n")
+    parts.append(header)
+    parts.append("\\endfirsthead\n") # This ends the setup for the first header
 
     # Set up the headers for subsequent pages, if the table breaks
-    latex_str += "\\multicolumn{" + str(num_columns) + "}{c}{{\\tablename\\ \\thetable{} -- continued from previous page}}\\\\\n"
-    latex_str += "\\hline\n"
-    latex_str += "Arithmetic & " + " & ".join(escape_latex(node) for node in data[first_key].keys()) + "\\\\ \\hline\n"
-    latex_str += "\\endhead\n"
+    parts.append("\\multicolumn{" + str(num_columns) + "}{c}{{\\tablename\\ \\thetable{} -- continued from previous page}}\\\\\n")
+    parts.append("\\hline\n")
+    parts.append(header)
+    parts.append("\\endhead\n")
 
     # Rows for each arithmetic type
     for arithmetic, nodes in data.items():
-        row = [escape_latex(arithmetic)]
-        for process_node in nodes.keys():
-            val = escape_latex(str(nodes[process_node][metric]))
-            row.append(val)
-        latex_str += " & ".join(row) + "\\\\ \\hline\n"
+        row = [escape_latex(arithmetic)] + [escape_latex(str(values[metric])) for values in nodes.values()]
+        parts.append(" & ".join(row) + "\\\\ \\hline\n")
 
     # End the table
-    latex_str += "\\end{tabularx}\n"
+    parts.append("\\end{tabularx}\n")
 
-    return latex_str
+    return "".join(parts)
 
 def data_to_csv(data, metric, unit):
     # Get any key from the dictionary to determine the headers
     first_key = next(iter(data))
 
     # Header
-    csv_str = "Arithmetic," + ",".join(node for node in data[first_key].keys()) + "\n"
+    lines = ["Arithmetic," + ",".join(node for node in data[first_key].keys())]
 
-    # Rows for each arithmetic type
+    # Rows for each arithmetic type, joined once at the end
     for arithmetic, nodes in data.items():
-        row = [arithmetic]
-        for process_node in nodes.keys():
-            val = str(nodes[process_node][metric])
-            row.append(val)
-        csv_str += ",".join(row) + "\n"
+        lines.append(",".join([arithmetic] + [str(values[metric]) for values in nodes.values()]))
 
-    return csv_str
+    return "\n".join(lines) + "\n"
 
 #def data_to_plot(data, metric, unit):
 #    tech_nodes = list(data[list(data.keys())[0]].keys())
@@ -298,23 +293,50 @@ def data_to_csv(data, metric, unit):
 #    plt.savefig(f"{metric}_per_technode_comparison.pdf", format="pdf", bbox_inches="tight")
 #    plt.close()
 
+_figures = {}
+
+def reusable_figure(figsize, dpi):
+    """Returns a cleared Agg figure, shared by all the plots with the same size and dpi.
+
+    The figure is not registered with pyplot, so drawing a new plot only clears it
+    instead of creating and tearing down a figure manager each time. The subplot parameters
+    survive clear(), they are reset so that a subplots_adjust does not leak into the next plot.
+    """
+    from matplotlib import rcParams
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    key = (tuple(figsize), dpi)
+    fig = _figures.get(key)
+    if fig is None:
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        _figures[key] = fig
+    else:
+        fig.clear()
+        fig.subplotpars.update(**{name: rcParams[f"figure.subplot.{name}"] for name in ("left", "bottom", "right", "top", "wspace", "hspace")})
+    return fig
+
 def data_to_plot(data_dict, metric, unit):
+    import numpy as np
+    import matplotlib.pyplot as plt
+
     tech_nodes = list(next(iter(data_dict.values())).keys())  # Extract technology nodes
     num_subplots = len(tech_nodes)
 
-    # Get all unique adder sizes from the data dictionary
-    all_sizes = sorted(set(get_adder_size_from_name(design) for design in data_dict if get_adder_size_from_name(design) is not None))
+    # Get the adder sizes once for all designs (NaN when the design has none)
+    adder_sizes = np.array([get_adder_size_from_name(design) for design in data_dict], dtype=float)
     cmap = plt.get_cmap('viridis')  # Color map for visual consistency
-    norm = plt.Normalize(min(all_sizes), max(all_sizes))  # Normalization for color mapping
+    norm = plt.Normalize(np.nanmin(adder_sizes), np.nanmax(adder_sizes))  # Normalization for color mapping
 
     fig_dim = set_size(fig_text_width, 1, (5, 1))
-    fig, axes = plt.subplots(num_subplots, 1, figsize=fig_dim, dpi=500)
+    fig = reusable_figure(fig_dim, 500)
+    axes = fig.subplots(num_subplots, 1)
     if num_subplots == 1:
         axes = [axes]  # Ensure axes is iterable for a single subplot case
 
     for index, (ax, tech_node) in enumerate(zip(axes, tech_nodes)):
-        values = [safe_float(data_dict[design][tech_node].get(metric, None)) for design in data_dict]
-        adder_sizes = [get_adder_size_from_name(design) for design in data_dict]
+        values = np.array([safe_float(data_dict[design][tech_node].get(metric, None)) for design in data_dict], dtype=float)
 
         scatter = ax.scatter(adder_sizes, values, c=adder_sizes, cmap=cmap, norm=norm, edgecolor='none')
         ax.set_xscale('log')  # Set logarithmic scale for x-axis
@@ -333,9 +355,8 @@ def data_to_plot(data_dict, metric, unit):
     fig.supxlabel('Adder Size (Bits)')
     #fig.supylabel(f"{metric.capitalize()} ({unit})")
 
-    plt.tight_layout()
-    plt.savefig(f"{metric}_across_technodes_comparison.pdf", bbox_inches='tight')
-    plt.close(fig)
+    fig.tight_layout()
+    fig.savefig(f"{metric}_across_technodes_comparison.pdf", bbox_inches='tight')
 
 def format_latex(unit):
     if "^" in unit:
@@ -343,37 +364,44 @@ def format_latex(unit):
     return unit
 
 def data_to_per_plot(data_dict, metric1, metric2, unit1, unit2):
+    import numpy as np
+    import matplotlib.pyplot as plt
+
     tech_nodes = list(next(iter(data_dict.values())).keys())
     num_subplots = len(tech_nodes)
 
-    # Define the colormap and normalization for adder sizes
+    # Per design attributes do not depend on the tech node, missing values become NaN
+    designs = list(data_dict.keys())
+    adder_sizes = np.array([get_adder_size_from_name(design) for design in designs], dtype=float)
+    categories = np.array([get_category(design) for design in designs])
+
+    # Define the colormap and normalization for adder sizes, from the sizes looked up once above
     cmap = plt.get_cmap('viridis')
-    all_adder_sizes = sorted(set(get_adder_size_from_name(design) for design in data_dict if get_adder_size_from_name(design) is not None))
-    norm = plt.Normalize(min(all_adder_sizes), max(all_adder_sizes))
+    norm = plt.Normalize(np.nanmin(adder_sizes), np.nanmax(adder_sizes))
 
     fig_dim = set_size(fig_text_width, 1, (5, 1))
-    fig, axes = plt.subplots(num_subplots, 1, figsize=fig_dim, dpi=500)
+    fig = reusable_figure(fig_dim, 500)
+    axes = fig.subplots(num_subplots, 1)
     if num_subplots == 1:
         axes = [axes]
 
+    # Use color based on adder size, black when the design has none
+    colors = cmap(norm(adder_sizes))
+    colors[np.isnan(adder_sizes)] = (0, 0, 0, 1)
+
     for index_ax, (ax, tech_node) in enumerate(zip(axes, tech_nodes)):
-        for design, tech_data in data_dict.items():
-            x_value = safe_float(tech_data[tech_node].get(metric1, None))
-            y_value = safe_float(tech_data[tech_node].get(metric2, None))
-            if x_value is not None and y_value is not None and y_value != 0:
-                value = x_value / y_value
-                category = get_category(design)
-                marker_shape = category_to_marker.get(category, 'x')
-                adder_size = get_adder_size_from_name(design)
+        x_values = np.array([safe_float(data_dict[design][tech_node].get(metric1, None)) for design in designs], dtype=float)
+        y_values = np.array([safe_float(data_dict[design][tech_node].get(metric2, None)) for design in designs], dtype=float)
 
-                # Use color based on adder size
-                if adder_size is None:
-                    color = "black"
-                else:
-                    color = cmap(norm(adder_size))
+        # Ratio of the two metrics for all the designs at once
+        valid = ~np.isnan(x_values) & ~np.isnan(y_values) & (y_values != 0)
+        values = np.divide(x_values, y_values, out=np.full_like(x_values, np.nan), where=valid)
 
-                ax.scatter(adder_size, value, label=f"{category} {adder_size} bit",
-                           marker=marker_shape, color=color, edgecolor='none')
+        # One scatter call per category, as the marker shape depends on it
+        for category in np.unique(categories[valid]):
+            mask = valid & (categories == category)
+            ax.scatter(adder_sizes[mask], values[mask], label=category,
+                       marker=category_to_marker.get(category, 'x'), color=colors[mask], edgecolor='none')
 
 
 
@@ -406,9 +434,8 @@ def data_to_per_plot(data_dict, metric1, metric2, unit1, unit2):
     fig.supxlabel('Adder Size (Bits)')
     fig.supylabel(rf"$\frac{{{metric1}}}{{{metric2}}} \, \left(\frac{{{unit1}}}{{{unit2}}}\right)$")
 
-    plt.tight_layout()
-    plt.savefig(f"{metric1}_per_{metric2}_across_technodes_comparison.pdf", bbox_inches='tight')
-    plt.close(fig)
+    fig.tight_layout()
+    fig.savefig(f"{metric1}_per_{metric2}_across_technodes_comparison.pdf", bbox_inches='tight')
 
 #def get_adder_size(design_name):
 #    design_info = division_configs.get(design_name)
@@ -424,9 +451,18 @@ def data_to_per_plot(data_dict, metric1, metric2, unit1, unit2):
 #        return None
 
 def safe_float(value):
+    """Converts a metric value to float, None if it is missing or not a number.
+
+    Numbers and missing values are handled without going through try/except,
+    only strings (e.g. "N/A" or "1.23e-05") are parsed.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value is None:
+        return None
     try:
         return float(value)
-    except ValueError:
+    except (TypeError, ValueError):
         return None
 
 category_to_marker = {
@@ -444,11 +480,13 @@ def get_marker(design):
     return category_to_marker.get(category, '')  # Default to 'x' if category is not recognized.
 
 
+@lru_cache(maxsize=None)
 def get_category(design):
     """Fetch the arithmetic category for the given design."""
     config = total_configs.get(design, {})
     return config.get('category', 'Unknown')
 
+@lru_cache(maxsize=None)
 def get_adder_size_from_name(design_name):
     """Extracts adder size from design name."""
     if "serial_adder" in design_name:
@@ -469,6 +507,9 @@ def refine_axis(ax, data, axis="y", log_scale=False):
     Returns:
         ax: Refined axes object.
     """
+    import numpy as np
+    import matplotlib.ticker as ticker
+    from matplotlib.ticker import FuncFormatter
 
     set_limit = ax.set_xlim if axis == "x" else ax.set_ylim
     major_locator = ax.xaxis.set_major_locator if axis == "x" else ax.yaxis.set_major_locator
@@ -528,21 +569,29 @@ def refine_axis(ax, data, axis="y", log_scale=False):
 
     return ax
 
+# Marker of each (category, bitwidth) family key, built once like category_to_marker
+key_to_marker_dict = {
+    "IEEE75464": "h",   # Circle
+    "IEEE75432": "o",   # Circle
+    "IEEE75416": "s",   # Square
+    "Posit32": "^",     # Triangle up
+    "Posit16": "v",     # Triangle down
+    "Posit8": "<",      # Triangle left
+    "BrainFloat16": ">", # Triangle right
+}
+
 def key_to_marker(key):
-    marker_dict = {
-        "IEEE75464": "h",   # Circle
-        "IEEE75432": "o",   # Circle
-        "IEEE75416": "s",   # Square
-        "Posit32": "^",     # Triangle up
-        "Posit16": "v",     # Triangle down
-        "Posit8": "<",      # Triangle left
-        "BrainFloat16": ">", # Triangle right
-    }
-    return marker_dict.get(key, "x")  # Default to 'x' if key not found
+    return key_to_marker_dict.get(key, "x")  # Default to 'x' if key not found
 
 
 
 def data_to_versus_plot(data_dict, metric1, metric2, unit1, unit2):
+    import numpy as np
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from matplotlib.gridspec import GridSpec
+    from mpl_toolkits.axes_grid1 import make_axes_locatable # for the size of colormap
+
     tech_nodes = list(next(iter(data_dict.values())).keys())  # extract tech nodes
     num_subplots = len(tech_nodes)
 
@@ -565,7 +614,7 @@ def data_to_versus_plot(data_dict, metric1, metric2, unit1, unit2):
 
     fig_dim = set_size(fig_text_width,1,(5,1))
     #fig = plt.figure(constrained_layout=True, figsize=fig_dim, dpi=500)
-    fig = plt.figure(constrained_layout=False, figsize=fig_dim, dpi=500)
+    fig = reusable_figure(fig_dim, 500)
     gs = GridSpec(num_subplots, 1,figure=fig)
 
     # Create an initial axis object
@@ -580,6 +629,15 @@ def data_to_versus_plot(data_dict, metric1, metric2, unit1, unit2):
     legend_handles = {}
     family_data = {}
 
+    # Index the family key and adder size of every design once, they do not depend on the tech node
+    design_index = {}
+    for design in data_dict:
+        category = get_category(design)
+        adder_size = get_adder_size_from_name(design)
+        computer_format_width = int(division_configs[design]["bitwidth"])
+        print(category,adder_size,computer_format_width)
+        design_index[design] = (f"{category}{computer_format_width}", adder_size)
+
     for index_ax, (ax, tech_node) in enumerate(zip(axes, tech_nodes)):
         x_values = defaultdict(list)
         y_values = defaultdict(list)
@@ -588,18 +646,10 @@ def data_to_versus_plot(data_dict, metric1, metric2, unit1, unit2):
             x_value = safe_float(tech_data[tech_node].get(metric1, None))
             y_value = safe_float(tech_data[tech_node].get(metric2, None))
 
-            category = get_category(design)
-            marker_shape = category_to_marker.get(category, 'x')  # Default to 'x' if category is not recognized
-            adder_size = get_adder_size_from_name(design)
-            computer_format_width = int(division_configs[design]["bitwidth"])
-
             #color = cmap(norm(adder_size)) if adder_size else 'black'  # default to black if size not found
-            print(category,adder_size,computer_format_width)
-
-
             #primary_color = cmap1(norm1(adder_size)) if adder_size else 'black'  # colormap 1
             if x_value is not None and y_value is not None:
-                key = f"{category}{computer_format_width}"
+                key, adder_size = design_index[design]
                 x_values[key].append(x_value)
                 y_values[key].append(y_value)
                 adder_sizes[key].append(adder_size)
@@ -620,20 +670,21 @@ def data_to_versus_plot(data_dict, metric1, metric2, unit1, unit2):
             adder_sizes[key] = custom_sort(adder_sizes[key])
 
         for key, (m1, m2, adder_size) in zip(x_values.keys(), zip(x_values.values(), y_values.values(), adder_sizes.values())):
+            if len(m1) < 2:
+                continue
             marker_style = key_to_marker(key)
-            for i in range(1, len(m1)):
-                line_color = cmap1(norm1(adder_size[i]))
-                if i == 1:
-                    # Plot the line segment between the first and second point
-                    ax.plot(m1[i-1:i+1], m2[i-1:i+1], color=line_color, linestyle='-')
-                    # Plot the first marker as a black cross
-                    scatter1 = ax.scatter(m1[i-1], m2[i-1], color="black", marker='x', label=key if i == 1 else "")
-                    # Plot the second marker with its respective color
-                    scatter2= ax.scatter(m1[i], m2[i], color=line_color, marker=marker_style)
-                    if key not in legend_handles:
-                        legend_handles[key] = scatter2
-                else:
-                    ax.plot(m1[i-1:i+1], m2[i-1:i+1], color=line_color, linestyle='-', marker=marker_style, markerfacecolor=line_color, markeredgecolor=line_color, label=key if i == 1 else "")
+            # Each point after the first one, and the segment ending on it, is colored by its adder size
+            line_colors = cmap1(norm1(np.array(adder_size[1:], dtype=float)))
+
+            # All the segments of the family are drawn as a single collection
+            points = np.column_stack([m1, m2])
+            ax.add_collection(LineCollection(np.stack([points[:-1], points[1:]], axis=1), colors=line_colors, linestyles='-'))
+            # Plot the first marker as a black cross
+            ax.scatter(m1[0], m2[0], color="black", marker='x', label=key)
+            # Plot the other markers with their respective colors in one call
+            scatter = ax.scatter(m1[1:], m2[1:], color=line_colors, marker=marker_style)
+            if key not in legend_handles:
+                legend_handles[key] = scatter
 
 
         #ax.set_xlabel(f"{metric1.capitalize()} (Unit)")
@@ -678,18 +729,21 @@ def data_to_versus_plot(data_dict, metric1, metric2, unit1, unit2):
     cax.xaxis.set_ticks_position('top')
     cax.xaxis.set_label_position('top')
 
-    plt.tight_layout()
-    plt.savefig(f"{metric1}_vs_{metric2}_comparison.pdf", bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(f"{metric1}_vs_{metric2}_comparison.pdf", bbox_inches='tight')
     #plt.savefig(f"{metric1}_vs_{metric2}_comparison.pdf")
-    plt.close(fig)
 
 def data_to_simple_versus_plot(data_dict, metric1, metric2, unit1, unit2):
+    import matplotlib.pyplot as plt
+    from matplotlib.gridspec import GridSpec
+    from matplotlib.lines import Line2D  # For custom legend
+
     tech_nodes = list(next(iter(data_dict.values())).keys())
     num_subplots = len(tech_nodes)
 
     fig_dim = set_size(fig_text_width,1,(1,5))
     #fig = plt.figure(constrained_layout=True, figsize=fig_dim, dpi=500)
-    fig = plt.figure(constrained_layout=True, figsize=fig_dim, dpi=500)
+    fig = reusable_figure(fig_dim, 500)
 
     #gs = GridSpec(num_subplots, 1,figure=fig)
     gs = GridSpec(1,num_subplots,figure=fig)
@@ -736,11 +790,10 @@ def data_to_simple_versus_plot(data_dict, metric1, metric2, unit1, unit2):
     #fig.legend(handles, labels, loc='upper center', bbox_to_anchor=(0.5, 1.05), ncol=len(labels), fontsize='small', title="Arithmetic Category", fancybox=False, framealpha=1.0, edgecolor="white")
 
     # Fine-tuning layout and saving
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.85)  # Adjust the top padding to make room for the legend
-    plt.savefig(f"{metric1}_vs_{metric2}_comparison.svg", bbox_inches='tight')
+    fig.tight_layout()
+    fig.subplots_adjust(top=0.85)  # Adjust the top padding to make room for the legend
+    fig.savefig(f"{metric1}_vs_{metric2}_comparison.svg", bbox_inches='tight')
     #plt.savefig(f"{metric1}_vs_{metric2}_comparison.pdf")
-    plt.close(fig)
 
 #def data_to_simple_versus_plot(data_dict, metric1, metric2, unit1, unit2):
 #    tech_nodes = list(next(iter(data_dict.values())).keys())
@@ -784,28 +837,14 @@ def data_to_simple_versus_plot(data_dict, metric1, metric2, unit1, unit2):
 #    plt.subplots_adjust(top=0.85)  # Adjust as needed to fit your layout
 #
 #    plt.savefig(f"{metric1}_vs_{metric2}_comparison.pdf", bbox_inches='tight')
-    plt.close(fig)
-
-def parse_args():
-    parser = argparse.ArgumentParser(description="Generate tables and plots from SUF reports.")
-    parser.add_argument('--type', choices=['csv', 'latex', 'terminal', 'plot', 'all'], required=True,
-                        help='The type of table output or plot.')
-    parser.add_argument('--metric', type=str, required=True,
-                        help='The metric to display or compare. For "versus" plots, use the format "metric1VSmetric2". For "ratio" plots, use the format "metric1PERmetric2".')
-    return parser.parse_args()
-
-def main():
-
-    args = parse_args()
 
-
-    metric_units = {
-        'power': 'W',
-        'area': 'm^{2}',
-        'count_cell': 'cells',
-        'latency': 'Clock Cycles'
-        # Add other metrics and their units if needed.
-    }
+def set_plot_style():
+    """Applies the publication quality style, also used as process pool initializer."""
+    # matplotlib is only imported when plotting, figures are saved so no GUI backend is needed
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
     # Configurations for publication quality
     tex_fonts = {
@@ -834,10 +873,52 @@ def main():
     plt.style.use('grayscale')
     plt.rcParams.update(tex_fonts)
 
+def _render_plot(metric, unit, data_dict):
+    data_to_plot(data_dict, metric, unit)
+
+def render_plots(data_dict, plot_jobs):
+    """Renders one figure per worker process, the figures being independent of each other.
+
+    Args:
+        data_dict (dict): Data dictionary from populate_data_dict.
+        plot_jobs (list): List of (metric, unit) tuples to plot.
+    """
+    if len(plot_jobs) == 1:
+        set_plot_style()
+        data_to_plot(data_dict, *plot_jobs[0])
+        return
+
+    metrics, units = zip(*plot_jobs)
+    max_workers = min(len(plot_jobs), os.cpu_count())
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=set_plot_style) as executor:
+        list(executor.map(partial(_render_plot, data_dict=data_dict), metrics, units))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate tables and plots from SUF reports.")
+    parser.add_argument('--type', choices=['csv', 'latex', 'terminal', 'plot', 'all'], required=True,
+                        help='The type of table output or plot.')
+    parser.add_argument('--metric', type=str, required=True,
+                        help='The metric to display or compare. For "versus" plots, use the format "metric1VSmetric2". For "ratio" plots, use the format "metric1PERmetric2".')
+    return parser.parse_args()
+
+def main():
+
+    args = parse_args()
+
+
+    metric_units = {
+        'power': 'W',
+        'area': 'm^{2}',
+        'count_cell': 'cells',
+        'latency': 'Clock Cycles'
+        # Add other metrics and their units if needed.
+    }
+
     if 'VS' in args.metric:
         metric1, metric2 = args.metric.split('VS')
         unit1, unit2 = metric_units.get(metric1, ''), metric_units.get(metric2, '')
         if args.type == 'plot':
+            set_plot_style()
             data_dict = populate_data_dict()
             data_to_simple_versus_plot(data_dict, metric1, metric2, unit1, unit2)
             print(f"'{metric1} vs {metric2}' plot saved as {metric1}_vs_{metric2}_comparison.pdf\n")
@@ -848,6 +929,7 @@ def main():
         metric1, metric2 = args.metric.split('PER')
         unit1, unit2 = metric_units.get(metric1, ''), metric_units.get(metric2, '')
         if args.type == 'plot':
+            set_plot_style()
             data_dict = populate_data_dict()
             data_to_per_plot(data_dict, metric1, metric2, unit1, unit2)
             print(f"'{metric1} per {metric2}' plot saved as {metric1}_per_{metric2}_comparison.pdf\n")
@@ -859,6 +941,7 @@ def main():
         table_types = ['csv', 'latex', 'terminal', 'plot'] if args.type == 'all' else [args.type]
 
         data_dict = populate_data_dict()
+        plot_jobs = []
         for metric in metrics:
             for table_type in table_types:
                 unit = metric_units.get(metric, '')
@@ -867,16 +950,17 @@ def main():
                     print(data_to_terminal(data_dict, metric, unit))
                 elif table_type == 'csv':
                     csv_str = data_to_csv(data_dict, metric, unit)
-                    with open(f"{metric}_data.csv", 'w') as f:
-                        f.write(csv_str)
+                    write_if_changed(f"{metric}_data.csv", csv_str)
                     print(f"CSV file for {metric} saved as {metric}_data.csv\n")
                 elif table_type == 'latex':
                     latex_str = data_to_latex(data_dict, metric, unit)
-                    with open(f"{metric}_data.tex", 'w') as f:
-                        f.write(latex_str)
+                    write_if_changed(f"{metric}_data.tex", latex_str)
                     print(f"LaTeX file for {metric} saved as {metric}_data.tex\n")
                 elif table_type == 'plot':
-                    data_to_plot(data_dict, metric, unit)
+                    plot_jobs.append((metric, unit))
+
+        if plot_jobs:
+            render_plots(data_dict, plot_jobs)
 
 
 